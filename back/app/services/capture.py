@@ -0,0 +1,199 @@
+import atexit
+import gzip
+import json
+import logging
+import threading
+import time
+import zlib
+
+GZIP_MAGIC = b'\x1f\x8b\x08'
+
+
+def _scrub(value):
+    """Replace any text in value with filler of the same length, keeping its JSON shape."""
+    if isinstance(value, str):
+        return 'x' * len(value)
+    if isinstance(value, list):
+        return [_scrub(v) for v in value]
+    if isinstance(value, dict):
+        return {f"k{i}": _scrub(v) for i, v in enumerate(value.values())}
+    return value
+
+
+def anonymize_payload(data):
+    """
+    Strip identifying information from a /api/generate-groups payload.
+
+    Student ids are replaced by stable pseudonyms (s1, s2, ...) and preferences
+    are remapped accordingly. Names get their own pseudonyms (n1, n2, ...) and
+    are only emitted when present, so missing fields and duplicate names
+    behave the same on replay. Malformed bodies and entries are scrubbed
+    rather than dropped, so the server answers the replay as it did the
+    original request.
+
+    Args:
+        data: Decoded JSON body of the request
+
+    Returns:
+        Anonymized payload, a dict with the same keys as data when it was one
+    """
+    if not isinstance(data, dict):
+        return _scrub(data)
+
+    id_pseudonyms = {}
+    name_pseudonyms = {}
+
+    def pseudonym(value, table, prefix):
+        # Empty values carry no identity and are rejected by the algorithm as-is
+        if value in ('', None):
+            return value
+        key = str(value)
+        if key not in table:
+            table[key] = f"{prefix}{len(table) + 1}"
+        return table[key]
+
+    result = {}
+    if 'students' in data:
+        if not isinstance(data['students'], list):
+            result['students'] = _scrub(data['students'])
+        else:
+            students = []
+            for s in data['students']:
+                if not isinstance(s, dict):
+                    students.append(_scrub(s))
+                    continue
+                student = {k: s[k] for k in ('mean', 'alt', 'present') if k in s}
+                if 'id' in s:
+                    student['id'] = pseudonym(s['id'], id_pseudonyms, 's')
+                if 'full_name' in s:
+                    student['full_name'] = pseudonym(s['full_name'], name_pseudonyms, 'n')
+                students.append(student)
+            result['students'] = students
+
+    if 'preferences' in data:
+        if not isinstance(data['preferences'], list):
+            result['preferences'] = _scrub(data['preferences'])
+        else:
+            preferences = []
+            for p in data['preferences']:
+                if not isinstance(p, dict):
+                    preferences.append(_scrub(p))
+                    continue
+                preference = {'points': p['points']} if 'points' in p else {}
+                if 'student_id' in p:
+                    preference['student_id'] = pseudonym(p['student_id'], id_pseudonyms, 's')
+                if 'preferred_id' in p:
+                    preference['preferred_id'] = pseudonym(p['preferred_id'], id_pseudonyms, 's')
+                preferences.append(preference)
+            result['preferences'] = preferences
+
+    if 'n' in data:
+        result['n'] = _scrub(data['n'])
+
+    return result
+
+
+class TrafficCapture:
+    """Append anonymized requests and their latencies to a gzip-compressed JSONL log."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def record(self, payload, latency_ms, status, ts=None):
+        """Log one request; ts is its wall-clock arrival time, used to space the replay."""
+        line = json.dumps({
+            'ts': time.time() if ts is None else ts,
+            'latency_ms': round(latency_ms, 3),
+            'status': status,
+            'payload': anonymize_payload(payload),
+        })
+        with self._lock:
+            # Opened on first use so only the process serving requests writes the log
+            if self._file is None:
+                self._file = gzip.open(self.path, 'ab')
+            self._file.write((line + '\n').encode('utf-8'))
+            # Sync flush makes every complete line readable even if the process dies
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _read_members(data):
+    """
+    Decompress every gzip member in data, skipping over damaged ones.
+
+    Yields (text, clean) for each member found; clean is False when the member
+    was cut short or corrupt, in which case text holds what could be recovered.
+    """
+    offset = 0
+    while True:
+        offset = data.find(GZIP_MAGIC, offset)
+        if offset < 0:
+            return
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = []
+        position = offset
+        while position < len(data) and not decompressor.eof:
+            chunk = data[position:position + 4096]
+            checkpoint = decompressor.copy()
+            try:
+                chunks.append(decompressor.decompress(chunk))
+                position += len(chunk)
+            except zlib.error:
+                # Replay the chunk byte by byte to keep the output decoded before the damage
+                decompressor = checkpoint
+                try:
+                    for i in range(len(chunk)):
+                        chunks.append(decompressor.decompress(chunk[i:i + 1]))
+                except zlib.error:
+                    pass
+                break
+        text = b''.join(chunks)
+        if decompressor.eof:
+            yield text.decode('utf-8', errors='replace'), True
+            offset = position - len(decompressor.unused_data)
+        else:
+            # Damaged member: a later member may start anywhere past its header
+            yield text.decode('utf-8', errors='replace'), False
+            offset += len(GZIP_MAGIC)
+
+
+def load_capture(path):
+    """
+    Read back the records of a capture log, ordered by timestamp.
+
+    A server killed mid-write leaves a damaged gzip member in the log; the
+    records before it, the complete lines inside it and every member appended
+    after a restart are still returned.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    records = []
+    damaged = 0
+    for text, clean in _read_members(data):
+        lines = text.split('\n')
+        if not clean:
+            damaged += 1
+            # The last line of a damaged member may be cut in half
+            lines = lines[:-1]
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                damaged += 1
+    if damaged:
+        logging.warning(f"Capture log {path} has {damaged} truncated or corrupt parts, "
+                        f"keeping the {len(records)} records that could be read")
+    records.sort(key=lambda r: r.get('ts', 0))
+    return records
@@ -0,0 +1,216 @@
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from capture import TrafficCapture, anonymize_payload, load_capture
+
+# replay.py lives in back/, two levels above this file
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from replay import percentile, replay
+
+
+class TestCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.payload = {
+            "students": [
+                {"id": "1", "full_name": "Alice", "mean": 13, "alt": False, "present": True},
+                {"id": "2", "full_name": "Bob", "mean": 11, "alt": True, "present": True},
+                {"id": "3", "full_name": "Bob", "mean": 9, "alt": False, "present": True},
+                {"id": "4", "mean": 15, "alt": False, "present": True},
+            ],
+            "preferences": [
+                {"student_id": "1", "preferred_id": "2", "points": 10},
+                {"student_id": "2", "preferred_id": "3", "points": 5},
+                {"student_id": "3", "preferred_id": "1", "points": 2},
+            ],
+            "n": 2,
+        }
+        fd, self.path = tempfile.mkstemp(suffix='.jsonl.gz')
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_anonymize_keeps_preference_graph(self):
+        # Preferences should map between the same pseudonyms as the students they referred to
+        result = anonymize_payload(self.payload)
+        ids = [s["id"] for s in result["students"]]
+        edges = [(p["student_id"], p["preferred_id"], p["points"]) for p in result["preferences"]]
+        self.assertEqual(edges, [(ids[0], ids[1], 10), (ids[1], ids[2], 5), (ids[2], ids[0], 2)])
+        self.assertEqual(result["n"], 2)
+
+    def test_anonymize_removes_identities(self):
+        # No original id or name may appear anywhere in the anonymized payload
+        dumped = json.dumps(anonymize_payload(self.payload))
+        for value in ('"1"', '"2"', '"3"', '"4"', 'Alice', 'Bob'):
+            self.assertNotIn(value, dumped)
+
+    def test_anonymize_preserves_missing_and_duplicate_names(self):
+        # Same name maps to the same pseudonym, and a missing name stays missing
+        students = anonymize_payload(self.payload)["students"]
+        self.assertEqual(students[1]["full_name"], students[2]["full_name"])
+        self.assertNotEqual(students[0]["full_name"], students[1]["full_name"])
+        self.assertNotIn("full_name", students[3])
+
+    def test_anonymize_keeps_malformed_input_shape(self):
+        # Malformed bodies and entries are scrubbed, not dropped, so the server answers the same way
+        self.assertIsNone(anonymize_payload(None))
+        self.assertEqual(anonymize_payload(["Alice", 3]), ["xxxxx", 3])
+        result = anonymize_payload({"students": self.payload["students"] + ["Alice"],
+                                    "preferences": None})
+        self.assertEqual(len(result["students"]), 5)
+        self.assertEqual(result["students"][4], "xxxxx")
+        self.assertIsNone(result["preferences"])
+        self.assertNotIn("n", result)
+
+    def test_load_capture_reads_members_in_order(self):
+        # Each record is a separate gzip member; they should come back sorted by ts
+        capture = TrafficCapture(self.path)
+        capture.record(self.payload, 12.5, 200)
+        capture.record({"n": 3}, 3.0, 400)
+        capture.close()
+        with gzip.open(self.path, 'at', encoding='utf-8') as f:
+            f.write(json.dumps({"ts": 0, "latency_ms": 1, "status": 200, "payload": {}}) + '\n')
+
+        records = load_capture(self.path)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]["ts"], 0)
+        self.assertEqual([r["status"] for r in records[1:]], [200, 400])
+        self.assertEqual(records[1]["latency_ms"], 12.5)
+
+    def test_records_readable_while_capture_is_open(self):
+        # Lines are flushed as they are written, so a log whose writer died is still readable
+        capture = TrafficCapture(self.path)
+        capture.record(self.payload, 1.0, 200, ts=1)
+        capture.record(self.payload, 2.0, 200, ts=2)
+        with self.assertLogs(level='WARNING'):
+            records = load_capture(self.path)
+        self.assertEqual([r["ts"] for r in records], [1, 2])
+        capture.close()
+        self.assertEqual(len(load_capture(self.path)), 2)
+
+    def test_load_capture_after_killed_writer_restarts(self):
+        # A killed writer leaves its member without a trailer; a restarted server appends after it
+        live_path = self.path + '.live'
+        live = TrafficCapture(live_path)
+        for ts in (1, 2):
+            live.record(self.payload, 1.0, 200, ts=ts)
+        with open(live_path, 'rb') as src, open(self.path, 'wb') as dst:
+            dst.write(src.read())
+        live.close()
+        os.remove(live_path)
+
+        capture = TrafficCapture(self.path)
+        capture.record(self.payload, 1.0, 200, ts=3)
+        capture.close()
+        with self.assertLogs(level='WARNING'):
+            records = load_capture(self.path)
+        self.assertEqual([r["ts"] for r in records], [1, 2, 3])
+
+    def test_load_capture_skips_truncated_member(self):
+        # A partial member left by a killed server should not lose earlier records
+        capture = TrafficCapture(self.path)
+        capture.record(self.payload, 1.0, 200)
+        capture.close()
+        with open(self.path, 'ab') as f:
+            f.write(gzip.compress(b'{"ts": 1}\n' * 100)[:20])
+        with self.assertLogs(level='WARNING'):
+            records = load_capture(self.path)
+        self.assertEqual(len(records), 1)
+
+    def test_load_capture_recovers_records_after_damage(self):
+        # A server restarted after being killed mid-write appends new members after the broken one
+        capture = TrafficCapture(self.path)
+        capture.record(self.payload, 1.0, 200, ts=1)
+        capture.close()
+        with open(self.path, 'ab') as f:
+            f.write(gzip.compress(b'{"ts": 99}\n' * 100)[:20])
+        capture = TrafficCapture(self.path)
+        for ts in (2, 3, 4):
+            capture.record(self.payload, 1.0, 200, ts=ts)
+        capture.close()
+        with self.assertLogs(level='WARNING'):
+            records = load_capture(self.path)
+        self.assertEqual([r["ts"] for r in records], [1, 2, 3, 4])
+
+    def test_percentile(self):
+        # Linear interpolation between closest ranks
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2.5)
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 0), 1)
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 100), 5)
+        self.assertAlmostEqual(percentile(list(range(1, 101)), 95), 95.05)
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    # Answers after a fixed delay, recording when each request arrived
+    delay = 0.05
+
+    def do_POST(self):
+        self.server.arrivals.append(time.monotonic())
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+        self.server.arrivals = []
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/generate-groups"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_unscheduled_latency_excludes_queueing(self):
+        # With speedup 0 there is no schedule, so waiting for a worker must not count as latency
+        records = [{"ts": 0, "payload": {}} for _ in range(5)]
+        results, duration = replay(records, self.url, concurrency=1, speedup=0, timeout=5)
+        latencies = [latency for latency, _, _, _ in results]
+        self.assertEqual(len(latencies), 5)
+        self.assertGreaterEqual(duration, 5 * SlowHandler.delay)
+        self.assertLess(max(latencies), 3 * SlowHandler.delay * 1000)
+
+    def test_replay_reports_captured_status(self):
+        # Each result carries the status seen in production so mismatches can be counted
+        records = [{"ts": 0, "status": 500, "payload": None}]
+        results, _ = replay(records, self.url, concurrency=1, speedup=0, timeout=5)
+        self.assertEqual(results[0][2:], (200, 500))
+
+    def test_replay_spacing_follows_arrival_time(self):
+        # Requests are logged when they finish, but must be replayed by when they arrived
+        path = os.path.join(tempfile.mkdtemp(), 'capture.jsonl.gz')
+        capture = TrafficCapture(path)
+        capture.record({"n": 1}, 3000.0, 200, ts=100.3)
+        capture.record({"n": 2}, 900.0, 200, ts=100.0)
+        capture.record({"n": 3}, 200.0, 200, ts=100.0)
+        capture.close()
+
+        records = load_capture(path)
+        self.assertEqual([r["ts"] for r in records], [100.0, 100.0, 100.3])
+        replay(records, self.url, concurrency=3, speedup=1, timeout=5)
+        arrivals = sorted(self.server.arrivals)
+        self.assertLess(arrivals[1] - arrivals[0], 0.1)
+        self.assertGreater(arrivals[2] - arrivals[0], 0.25)
+        self.assertLess(arrivals[2] - arrivals[0], 0.45)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+"""
+Replay captured /api/generate-groups traffic against a local server.
+
+Usage:
+    py replay.py capture.jsonl.gz --concurrency 20 --speedup 10 --server-pid 1234
+
+The capture log is produced by run.py when the CAPTURE_LOG environment
+variable is set. Server CPU and memory are sampled from /proc (Linux only)
+when --server-pid is given.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the app directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
+
+from services.capture import load_capture
+
+# Schedule lag above which the replay did not keep up with the captured traffic
+LAG_WARNING_MS = 100
+
+
+def send_request(url, payload, timeout, scheduled):
+    """
+    POST one payload that was due at the monotonic time `scheduled`.
+
+    Latency is measured from the scheduled time rather than from the actual
+    send, so time spent waiting for a free worker counts against the server
+    instead of being hidden (coordinated omission). Without a schedule
+    (`scheduled` is None) it is measured from the actual send.
+
+    Returns:
+        Tuple of (latency in ms, schedule lag in ms, status code or None on network error)
+    """
+    body = json.dumps(payload).encode('utf-8')
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    sent = time.monotonic()
+    if scheduled is None:
+        scheduled = sent
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = None
+    return (time.monotonic() - scheduled) * 1000, (sent - scheduled) * 1000, status
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+class ProcessSampler(threading.Thread):
+    """Periodically sample CPU usage and resident memory of a process from /proc."""
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.cpu_samples = []
+        self.rss_samples = []
+        self._stop_event = threading.Event()
+        self._ticks = os.sysconf('SC_CLK_TCK')
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+
+    def _read(self):
+        with open(f'/proc/{self.pid}/stat') as f:
+            # Fields after the command name, which may itself contain spaces
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu_seconds = (int(fields[11]) + int(fields[12])) / self._ticks
+        rss_bytes = int(fields[21]) * self._page_size
+        return cpu_seconds, rss_bytes
+
+    def run(self):
+        try:
+            last_cpu, _ = self._read()
+            last_time = time.monotonic()
+            while True:
+                # Take a final sample once stopped so short replays still get one
+                stopping = self._stop_event.wait(self.interval)
+                cpu, rss = self._read()
+                now = time.monotonic()
+                if now > last_time:
+                    self.cpu_samples.append(100 * (cpu - last_cpu) / (now - last_time))
+                    self.rss_samples.append(rss)
+                last_cpu, last_time = cpu, now
+                if stopping:
+                    break
+        except (OSError, IndexError, ValueError) as e:
+            print(f'Stopped sampling server process {self.pid}: {e}', file=sys.stderr)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def replay(records, url, concurrency, speedup, timeout):
+    """
+    Fire captured requests at the server, preserving their original spacing
+    divided by speedup (speedup <= 0 sends them as fast as the workers allow).
+
+    Returns:
+        Tuple of (list of (latency_ms, lag_ms, status, captured_status),
+        wall-clock duration in seconds)
+    """
+    results = []
+    results_lock = threading.Lock()
+    first_ts = records[0].get('ts', 0) if records else 0
+
+    def task(record, scheduled):
+        outcome = send_request(url, record['payload'], timeout, scheduled)
+        with results_lock:
+            results.append(outcome + (record.get('status'),))
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            scheduled = None
+            if speedup > 0:
+                scheduled = start + (record.get('ts', 0) - first_ts) / speedup
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(task, record, scheduled)
+    return results, time.monotonic() - start
+
+
+def print_report(results, duration, sampler, speedup):
+    latencies = [latency for latency, _, status, _ in results if status is not None]
+    lags = [lag for _, lag, _, _ in results]
+    errors = sum(1 for _, _, status, _ in results if status is None or status >= 400)
+    network_errors = sum(1 for _, _, status, _ in results if status is None)
+    # Requests answered differently than in production make the error rate misleading
+    mismatches = sum(1 for _, _, status, captured in results
+                     if captured is not None and status != captured)
+    total = len(results)
+
+    print(f'Requests:      {total} in {duration:.2f}s')
+    print(f'Throughput:    {total / duration if duration else 0:.2f} req/s')
+    print(f'Latency p50:   {percentile(latencies, 50):.1f} ms')
+    print(f'Latency p95:   {percentile(latencies, 95):.1f} ms')
+    print(f'Latency p99:   {percentile(latencies, 99):.1f} ms')
+    print(f'Error rate:    {100 * errors / total if total else 0:.2f}% '
+          f'({errors} errors, {network_errors} network failures)')
+    print(f'Status match:  {total - mismatches}/{total} requests got the captured status')
+    if speedup > 0:
+        print(f'Schedule lag:  p50 {percentile(lags, 50):.1f} ms, p99 {percentile(lags, 99):.1f} ms, '
+              f'max {max(lags, default=0):.1f} ms')
+    if speedup > 0 and max(lags, default=0) > LAG_WARNING_MS:
+        print(f'Warning: requests were sent up to {max(lags):.0f} ms behind schedule, '
+              f'so the captured load was not fully delivered; raise --concurrency '
+              f'or lower --speedup', file=sys.stderr)
+
+    if sampler is not None and not sampler.cpu_samples:
+        print('Server CPU/memory: no samples collected')
+    elif sampler is not None:
+        cpu = sampler.cpu_samples
+        rss = sampler.rss_samples
+        print(f'Server CPU:    avg {sum(cpu) / len(cpu):.1f}%, max {max(cpu):.1f}%')
+        print(f'Server memory: avg {sum(rss) / len(rss) / 2**20:.1f} MiB, '
+              f'max {max(rss) / 2**20:.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay captured /api/generate-groups traffic.')
+    parser.add_argument('capture', help='Path to the gzip-compressed JSONL capture log')
+    parser.add_argument('--url', default='http://localhost:5000/api/generate-groups')
+    parser.add_argument('--concurrency', type=int, default=10, help='Maximum requests in flight')
+    parser.add_argument('--speedup', type=float, default=1.0,
+                        help='Replay speed factor relative to capture time (0 = as fast as possible)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+    parser.add_argument('--server-pid', type=int,
+                        help='PID of the process serving requests, to sample CPU and memory '
+                             '(start run.py with CAPTURE_LOG set so the debug reloader is off)')
+    args = parser.parse_args()
+
+    if args.server_pid and not (sys.platform.startswith('linux') and hasattr(os, 'sysconf')):
+        print('--server-pid relies on /proc and is only supported on Linux', file=sys.stderr)
+        return 1
+
+    records = load_capture(args.capture)
+    if not records:
+        print('No requests found in capture log', file=sys.stderr)
+        return 1
+
+    sampler = None
+    if args.server_pid:
+        sampler = ProcessSampler(args.server_pid)
+        sampler.start()
+
+    results, duration = replay(records, args.url, max(1, args.concurrency), args.speedup, args.timeout)
+
+    if sampler is not None:
+        sampler.stop()
+
+    print_report(results, duration, sampler, args.speedup)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,37 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 import sys
 import os
+import time
 
 # Add the app directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
 from services.Newalgo import clustering_algorithm
+from services.capture import TrafficCapture
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
 
+# Opt-in traffic capture: set CAPTURE_LOG to a file path (e.g. capture.jsonl.gz)
+# to record anonymized /api/generate-groups requests for replay.py
+capture = TrafficCapture(os.environ['CAPTURE_LOG']) if os.environ.get('CAPTURE_LOG') else None
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+    g.start_wall = time.time()
+
+@app.after_request
+def capture_request(response):
+    if capture is not None and request.path == '/api/generate-groups' and request.method == 'POST':
+        latency_ms = (time.perf_counter() - g.start_time) * 1000
+        try:
+            capture.record(request.get_json(silent=True), latency_ms, response.status_code, g.start_wall)
+        except Exception as e:
+            app.logger.warning(f'Traffic capture failed: {e}')
+    return response
+
 @app.route('/api/generate-groups', methods=['POST'])
 def generate_groups():
     try:
@@ -43,4 +64,6 @@ def health_check():
     return jsonify({'status': 'healthy'})
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    # The debug reloader serves requests from a child process; keep everything in
+    # this process while capturing so replay.py --server-pid can sample its PID
+    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=capture is None) 
\ No newline at end of file